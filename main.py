@@ -14,7 +14,6 @@ The core thesis: Individual employment decisions, when aggregated, can predict c
 """
 
 import uvicorn
-from spike_research.api.api import app
 
 if __name__ == "__main__":
     print("🚀 Starting Spike Research API...")
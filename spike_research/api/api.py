@@ -1,10 +1,21 @@
-from typing import Any, Optional
+import asyncio
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
 from uuid import uuid4
 
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from neo4j.exceptions import ServiceUnavailable
 from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Import VC-focused modules
 from ..core.models import (
@@ -14,8 +25,78 @@ from ..core.models import (
     Investment,
     TransitionEvent,
 )
-from ..database.druid_database import send_transition_update
-from ..database.neo4j_database import create_database_connection
+from ..database.druid_database import send_transition_updates
+from ..database.neo4j_database import VCGraphDatabase, create_database_connection
+from ..utils.config import (
+    MAX_REQUEST_BYTES,
+    NEO4J_MAX_CONCURRENCY,
+    PAGERANK_CACHE_TTL,
+)
+
+
+# Node property names that may be interpolated into Cypher (properties cannot
+# be parameterized)
+PROPERTY_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Shared Neo4j connection; the driver pools sessions and is thread-safe, so one
+# instance serves every request instead of a new driver per call
+_database: Optional[VCGraphDatabase] = None
+_database_lock = threading.Lock()
+# When the last connect attempt failed; within RECONNECT_BACKOFF seconds of it
+# callers fail fast instead of each waiting out another connection timeout
+_database_failed_at: Optional[float] = None
+RECONNECT_BACKOFF = 5.0
+
+
+def get_database() -> VCGraphDatabase:
+    """Return the shared database connection, creating it on first use"""
+    global _database, _database_failed_at
+    db = _database
+    if db is not None and db.driver is not None:
+        return db
+    # Threadpool endpoints and background jobs can race here on startup; only
+    # one of them should build the driver
+    with _database_lock:
+        if _database is not None and _database.driver is not None:
+            return _database
+        if (
+            _database_failed_at is not None
+            and time.monotonic() - _database_failed_at < RECONNECT_BACKOFF
+        ):
+            raise ServiceUnavailable("Neo4j is unavailable, retrying shortly")
+
+        db = create_database_connection()
+        if db.driver is None:
+            _database_failed_at = time.monotonic()
+            raise ServiceUnavailable("Could not connect to Neo4j")
+        _database, _database_failed_at = db, None
+        return db
+
+
+# Created on first use so it binds to the server's running event loop
+_db_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def _run_db(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking database call in the threadpool, bounding how many are
+    in flight so concurrent requests cannot exhaust the driver's pool. Every
+    Neo4j call from an endpoint or background job goes through here."""
+    global _db_semaphore
+    if _db_semaphore is None:
+        _db_semaphore = asyncio.Semaphore(NEO4J_MAX_CONCURRENCY)
+
+    async with _db_semaphore:
+        return await run_in_threadpool(func, *args, **kwargs)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared database connection on shutdown"""
+    global _database
+    yield
+    if _database is not None:
+        _database.close()
+        _database = None
 
 
 # Initialize FastAPI app
@@ -23,9 +104,61 @@ app = FastAPI(
     title="Spike Research API",
     description="VC Research Platform - Talent Flow Analysis and Investment Intelligence",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
-# CORS middleware
+
+class RequestSizeLimitMiddleware:
+    """Reject oversized bodies before they are parsed, whether declared up front
+    by Content-Length or counted as a chunked body streams in"""
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None:
+            if not content_length.isdigit():
+                response = JSONResponse(
+                    status_code=400, content={"detail": "Invalid Content-Length header"}
+                )
+                await response(scope, receive, send)
+                return
+            if int(content_length) > self.max_bytes:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"Request body exceeds {self.max_bytes} bytes"},
+                )
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised while the endpoint reads its body, so the app's
+                    # exception handling turns it into the 413 response
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Request body exceeds {self.max_bytes} bytes",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+# Middleware added last runs first: CORS wraps the size limit so its 400/413
+# responses still carry CORS headers for browsers
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure for production
@@ -34,6 +167,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
 # ─── Request/Response Models ──────────────────────────────────────────────
 
 
@@ -49,6 +183,8 @@ class GraphProjectionRequest(BaseModel):
 class PageRankRequest(BaseModel):
     graph_name: str = "talent_flow"
     write_property: Optional[str] = None
+    damping_factor: float = 0.85
+    max_iterations: int = 20
 
 
 class CompanyAnalysisResponse(BaseModel):
@@ -82,10 +218,9 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     try:
-        db = create_database_connection()
+        db = await run_in_threadpool(get_database)
         # Test database connection
-        db.execute_query("MATCH (n) RETURN count(n) as total LIMIT 1")
-        db.close()
+        await _run_db(db.execute_query, "MATCH (n) RETURN count(n) as total LIMIT 1")
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": str(e)}
@@ -94,15 +229,70 @@ async def health_check():
 # ─── Graph Operations ──────────────────────────────────────────────────
 
 
+# Streamed PageRank results keyed by (graph_name, damping_factor, max_iterations),
+# mapped to (computed_at, records). Projections rebuilt on another worker or via
+# /api/query never clear this, so entries also expire after PAGERANK_CACHE_TTL.
+PAGERANK_CACHE_MAX = 32
+_pagerank_cache: dict[tuple[str, float, int], tuple[float, list[dict[str, Any]]]] = {}
+# _cached_pagerank runs on threadpool threads, so cache reads and writes hold
+# this lock. The generation is bumped whenever the graph changes under the
+# cache; a computation that spans a bump is returned but never stored.
+_pagerank_lock = threading.Lock()
+_pagerank_generation = 0
+
+
+def _invalidate_pagerank() -> None:
+    """Drop cached PageRank results after the projection or data changed"""
+    global _pagerank_generation
+    with _pagerank_lock:
+        _pagerank_generation += 1
+        _pagerank_cache.clear()
+
+
+def _cached_pagerank(
+    graph_name: str, damping_factor: float, max_iterations: int
+) -> list[dict[str, Any]]:
+    """PageRank stream results, reused for PAGERANK_CACHE_TTL seconds"""
+    key = (graph_name, damping_factor, max_iterations)
+    now = time.monotonic()
+    with _pagerank_lock:
+        cached = _pagerank_cache.get(key)
+        if cached is not None and now - cached[0] < PAGERANK_CACHE_TTL:
+            return cached[1]
+        generation = _pagerank_generation
+
+    results = get_database().run_pagerank(
+        graph_name=graph_name,
+        damping_factor=damping_factor,
+        max_iterations=max_iterations,
+    )
+    records = results.to_dict("records")
+
+    # run_pagerank also returns an empty frame when the query fails (no driver,
+    # missing projection), so never memoize an empty result
+    if not records:
+        return records
+    with _pagerank_lock:
+        if generation == _pagerank_generation:
+            # Re-insert so dict order stays oldest-first for eviction
+            _pagerank_cache.pop(key, None)
+            if len(_pagerank_cache) >= PAGERANK_CACHE_MAX:
+                _pagerank_cache.pop(next(iter(_pagerank_cache)), None)
+            _pagerank_cache[key] = (now, records)
+    return records
+
+
 @app.post("/api/graph/projection")
 async def create_graph_projection(request: GraphProjectionRequest):
     """Create talent flow graph projection for analysis"""
     try:
-        db = create_database_connection()
-        db.create_talent_flow_projection(
-            graph_name=request.graph_name, delete_existing=request.delete_existing
+        db = await run_in_threadpool(get_database)
+        await _run_db(
+            db.create_talent_flow_projection,
+            graph_name=request.graph_name,
+            delete_existing=request.delete_existing,
         )
-        db.close()
+        _invalidate_pagerank()
         return {"success": True, "graph_name": request.graph_name}
     except Exception as e:
         raise HTTPException(
@@ -114,16 +304,24 @@ async def create_graph_projection(request: GraphProjectionRequest):
 async def run_pagerank_analysis(request: PageRankRequest):
     """Run PageRank analysis on talent flow graph"""
     try:
-        db = create_database_connection()
-        results = db.run_pagerank(
-            graph_name=request.graph_name, write_property=request.write_property
+        if not request.write_property:
+            results = await _run_db(
+                _cached_pagerank,
+                request.graph_name,
+                request.damping_factor,
+                request.max_iterations,
+            )
+            return {"success": True, "results": results}
+
+        db = await run_in_threadpool(get_database)
+        await _run_db(
+            db.run_pagerank,
+            graph_name=request.graph_name,
+            write_property=request.write_property,
+            damping_factor=request.damping_factor,
+            max_iterations=request.max_iterations,
         )
-        db.close()
-
-        if request.write_property:
-            return {"success": True, "message": "PageRank scores written to graph"}
-        else:
-            return {"success": True, "results": results.to_dict("records")}
+        return {"success": True, "message": "PageRank scores written to graph"}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"PageRank analysis failed: {str(e)}"
@@ -133,21 +331,23 @@ async def run_pagerank_analysis(request: PageRankRequest):
 @app.get("/api/graph/rankings")
 async def get_company_rankings(metric: str = "pagerank_score", limit: int = 50):
     """Get top-ranked companies by specified metric"""
+    if not PROPERTY_NAME_RE.fullmatch(metric):
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {metric}")
+
     try:
-        db = create_database_connection()
-        query = """
+        db = await run_in_threadpool(get_database)
+        query = f"""
         MATCH (c:Company)
-        WHERE c.`$metric` IS NOT NULL
+        WHERE c.`{metric}` IS NOT NULL
         RETURN c.name as company_name,
                c.urn as company_urn,
-               c.`$metric` as score,
+               c.`{metric}` as score,
                c.funding_stage as funding_stage,
                c.exit_status as exit_status
         ORDER BY score DESC
         LIMIT $limit
         """
-        results = db.execute_query(query, {"metric": metric, "limit": limit})
-        db.close()
+        results = await _run_db(db.execute_query, query, {"limit": limit})
 
         return {"metric": metric, "rankings": results}
     except Exception as e:
@@ -157,22 +357,26 @@ async def get_company_rankings(metric: str = "pagerank_score", limit: int = 50):
 # ─── Company Analysis ──────────────────────────────────────────────────
 
 
+async def _fetch_company_data(
+    company_urn: str,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Fetch talent flow metrics and investment profile concurrently"""
+    db = await run_in_threadpool(get_database)
+    talent_metrics, investment_profile = await asyncio.gather(
+        _run_db(db.get_talent_flow_metrics, company_urn),
+        _run_db(db.get_company_investment_profile, company_urn),
+    )
+    return talent_metrics, investment_profile
+
+
 @app.get("/api/company/{company_urn}/analysis", response_model=CompanyAnalysisResponse)
 async def analyze_company(company_urn: str):
     """Comprehensive company analysis including talent flow and investment data"""
     try:
-        db = create_database_connection()
-
-        # Get talent flow metrics
-        talent_metrics = db.get_talent_flow_metrics(company_urn)
+        talent_metrics, investment_profile = await _fetch_company_data(company_urn)
         if not talent_metrics:
             raise HTTPException(status_code=404, detail="Company not found")
 
-        # Get investment profile
-        investment_profile = db.get_company_investment_profile(company_urn)
-
-        db.close()
-
         return CompanyAnalysisResponse(
             company_name=talent_metrics.get("company_name", "Unknown"),
             talent_inflow=talent_metrics.get("talent_inflow", 0),
@@ -193,12 +397,7 @@ async def analyze_company(company_urn: str):
 async def get_investment_signals(company_urn: str):
     """Generate investment signals based on talent flow and other factors"""
     try:
-        db = create_database_connection()
-
-        # Get basic metrics
-        talent_metrics = db.get_talent_flow_metrics(company_urn)
-        investment_profile = db.get_company_investment_profile(company_urn)
-
+        talent_metrics, investment_profile = await _fetch_company_data(company_urn)
         if not talent_metrics:
             raise HTTPException(status_code=404, detail="Company not found")
 
@@ -221,8 +420,6 @@ async def get_investment_signals(company_urn: str):
             "exit_status": investment_profile.get("exit_status"),
         }
 
-        db.close()
-
         return InvestmentSignalResponse(
             company_urn=company_urn, signal_strength=signal_strength, factors=factors
         )
@@ -241,29 +438,118 @@ async def get_investment_signals(company_urn: str):
 async def store_employees(employees: list[Employee]):
     """Store employee profiles"""
     try:
-        db = create_database_connection()
-        db.batch_store_employees(employees)
-        db.close()
-        return {"success": True, "stored": len(employees)}
+        db = await run_in_threadpool(get_database)
+        stored = await _run_db(db.batch_store_employees, employees)
+        return {
+            "success": stored == len(employees),
+            "stored": stored,
+            "failed": len(employees) - stored,
+        }
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Employee storage failed: {str(e)}"
         )
 
 
-@app.post("/api/data/transitions")
-async def store_transitions(transitions: list[TransitionEvent]):
-    """Store transition events"""
+# In-process registry of background ingestion jobs, keyed by job id. Finished
+# jobs are evicted after JOB_TTL seconds, or oldest first beyond JOB_MAX.
+JOBS: dict[str, dict[str, Any]] = {}
+JOB_BATCH_SIZE = 1000
+JOB_TTL = 3600
+JOB_MAX = 1000
+JOB_FINISHED = ("completed", "failed")
+
+
+def _prune_jobs():
+    """Evict expired finished jobs, and the oldest finished ones over JOB_MAX"""
+    now = time.time()
+    finished = [job_id for job_id, job in JOBS.items() if job["status"] in JOB_FINISHED]
+    for job_id in finished:
+        if now - JOBS[job_id]["finished_at"] >= JOB_TTL:
+            del JOBS[job_id]
+    # JOBS is insertion ordered, so the remaining finished ids are oldest first
+    for job_id in finished:
+        if len(JOBS) < JOB_MAX:
+            break
+        JOBS.pop(job_id, None)
+
+
+def _finish_job(job: dict[str, Any], status: str, error: Optional[str] = None):
+    """Mark a job finished so it can be pruned once JOB_TTL has passed"""
+    if error:
+        job["error"] = error
+    job["status"] = status
+    job["finished_at"] = time.time()
+
+
+async def _run_transition_job(job_id: str, transitions: list[TransitionEvent]):
+    """Store transitions batch by batch, recording progress on the job"""
+    job = JOBS[job_id]
+    job["status"] = "running"
     try:
-        db = create_database_connection()
-        db.batch_store_transitions(transitions)
-        db.close()
+        db = await run_in_threadpool(get_database)
+        for i in range(0, len(transitions), JOB_BATCH_SIZE):
+            batch = transitions[i : i + JOB_BATCH_SIZE]
+            stored = await _run_db(db.batch_store_transitions, batch)
+            job["stored"] += stored
+            job["failed"] += len(batch) - stored
+            if not await run_in_threadpool(send_transition_updates, batch):
+                job["druid_failed"] += len(batch)
+            job["done"] += len(batch)
+    except Exception as e:
+        _finish_job(job, "failed", str(e))
+        return
+
+    if job["stored"] == 0:
+        _finish_job(job, "failed", "No transitions were stored")
+    else:
+        _finish_job(job, "completed")
+
 
-        # Also send to Druid for time-series analysis
-        for transition in transitions:
-            send_transition_update(transition.model_dump())
+@app.post("/api/data/transitions")
+async def store_transitions(
+    transitions: list[TransitionEvent],
+    background_tasks: BackgroundTasks,
+    background: bool = False,
+):
+    """Store transition events, optionally as a background job"""
+    if not transitions:
+        return {"success": True, "stored": 0, "failed": 0, "druid_failed": 0}
+
+    if background:
+        _prune_jobs()
+        job_id = uuid4().hex
+        JOBS[job_id] = {
+            "status": "pending",
+            "total": len(transitions),
+            "done": 0,
+            "stored": 0,
+            "failed": 0,
+            "druid_failed": 0,
+        }
+        background_tasks.add_task(_run_transition_job, job_id, transitions)
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job_id, "events": f"/api/jobs/{job_id}/events"},
+        )
 
-        return {"success": True, "stored": len(transitions)}
+    try:
+        # Both the Neo4j write and the Druid post block, so keep them off the
+        # event loop
+        db = await run_in_threadpool(get_database)
+        stored = await _run_db(db.batch_store_transitions, transitions)
+
+        # Also send to Druid for time-series analysis as one ingestion task
+        sent = await run_in_threadpool(send_transition_updates, transitions)
+
+        # success reflects Neo4j only, as on the other store endpoints; a lost
+        # Druid task is reported separately, counted like druid_failed on jobs
+        return {
+            "success": stored == len(transitions),
+            "stored": stored,
+            "failed": len(transitions) - stored,
+            "druid_failed": 0 if sent else len(transitions),
+        }
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Transition storage failed: {str(e)}"
@@ -274,11 +560,13 @@ async def store_transitions(transitions: list[TransitionEvent]):
 async def store_companies(companies: list[Company]):
     """Store company data"""
     try:
-        db = create_database_connection()
-        for company in companies:
-            db.store_company(company)
-        db.close()
-        return {"success": True, "stored": len(companies)}
+        db = await run_in_threadpool(get_database)
+        stored = await _run_db(db.batch_store_companies, companies)
+        return {
+            "success": stored == len(companies),
+            "stored": stored,
+            "failed": len(companies) - stored,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Company storage failed: {str(e)}")
 
@@ -287,11 +575,13 @@ async def store_companies(companies: list[Company]):
 async def store_funds(funds: list[Fund]):
     """Store fund data"""
     try:
-        db = create_database_connection()
-        for fund in funds:
-            db.store_fund(fund)
-        db.close()
-        return {"success": True, "stored": len(funds)}
+        db = await run_in_threadpool(get_database)
+        stored = await _run_db(db.batch_store_funds, funds)
+        return {
+            "success": stored == len(funds),
+            "stored": stored,
+            "failed": len(funds) - stored,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fund storage failed: {str(e)}")
 
@@ -300,17 +590,53 @@ async def store_funds(funds: list[Fund]):
 async def store_investments(investments: list[Investment]):
     """Store investment relationships"""
     try:
-        db = create_database_connection()
-        for investment in investments:
-            db.store_investment(investment)
-        db.close()
-        return {"success": True, "stored": len(investments)}
+        db = await run_in_threadpool(get_database)
+        stored = await _run_db(db.batch_store_investments, investments)
+        return {
+            "success": stored == len(investments),
+            "stored": stored,
+            "failed": len(investments) - stored,
+        }
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Investment storage failed: {str(e)}"
         )
 
 
+# ─── Background Jobs ───────────────────────────────────────────────────
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the current state of a background job"""
+    if job_id not in JOBS:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JOBS[job_id]
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as server-sent events until the job finishes"""
+    if job_id not in JOBS:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last = None
+        while True:
+            job = JOBS.get(job_id)
+            if job is None:
+                break
+            job = dict(job)
+            if job != last:
+                yield f"data: {orjson.dumps(job).decode()}\n\n"
+                last = job
+            if job["status"] in JOB_FINISHED:
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 # ─── Custom Queries ────────────────────────────────────────────────────
 
 
@@ -321,9 +647,10 @@ async def custom_query(query: dict[str, Any]):
         raise HTTPException(status_code=400, detail="Query must include 'cypher' field")
 
     try:
-        db = create_database_connection()
-        results = db.execute_query(query["cypher"], query.get("params", {}))
-        db.close()
+        db = await run_in_threadpool(get_database)
+        results = await _run_db(
+            db.execute_query, query["cypher"], query.get("params", {})
+        )
         return {"results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query execution failed: {str(e)}")
@@ -374,9 +701,8 @@ async def predict_companies_batch(company_urns: list[str]):
 async def setup_database():
     """Setup database constraints and indexes"""
     try:
-        db = create_database_connection()
-        db.setup_constraints()
-        db.close()
+        db = await run_in_threadpool(get_database)
+        await _run_db(db.setup_constraints)
         return {"success": True, "message": "Database setup completed"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database setup failed: {str(e)}")
@@ -386,9 +712,9 @@ async def setup_database():
 async def clear_database():
     """Clear all data from database (use with caution!)"""
     try:
-        db = create_database_connection()
-        db.clear_database()
-        db.close()
+        db = await run_in_threadpool(get_database)
+        await _run_db(db.clear_database)
+        _invalidate_pagerank()
         return {"success": True, "message": "Database cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database clear failed: {str(e)}")
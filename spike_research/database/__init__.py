@@ -1,6 +1,10 @@
 """Database layer for graph and time-series data storage"""
 
-from .druid_database import send_to_druid, send_transition_update
+from .druid_database import (
+    send_to_druid,
+    send_transition_update,
+    send_transition_updates,
+)
 from .neo4j_database import VCGraphDatabase, create_database_connection, query_database
 
 
@@ -10,4 +14,5 @@ __all__ = [
     "query_database",
     "send_to_druid",
     "send_transition_update",
+    "send_transition_updates",
 ]
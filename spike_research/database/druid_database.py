@@ -1,23 +1,93 @@
-import json
-import os
+import copy
+import logging
+import time
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Union
 
+import orjson
 import requests
+from urllib3.exceptions import NewConnectionError
 
-# load environment variables
-from dotenv import load_dotenv
+from ..core.models import (  # Pydantic models
+    Company,
+    Employee,
+    Experience,
+    TimePeriod,
+    TransitionEvent,
+)
+from ..utils.config import (
+    DRUID_INGEST_URL,
+    DRUID_MAX_RETRIES,
+    DRUID_PASSWORD,
+    DRUID_TIMEOUT,
+    DRUID_USER,
+)
 
-from ..core.models import Company, Employee, Experience, TimePeriod  # Pydantic models
 
+logger = logging.getLogger(__name__)
 
-load_dotenv(override=True)
-# load DRUID_INGEST_URL from environment variables
-DRUID_INGEST_URL = os.getenv("DRUID_INGEST_URL")
 HEADERS = {"Content-Type": "application/json"}
-AUTH = (
-    os.getenv("DRUID_USER"),  # From environment variables
-    os.getenv("DRUID_PASSWORD"),  # From environment variables
-)
+AUTH = (DRUID_USER, DRUID_PASSWORD)
+
+# Shared session so ingestion calls reuse pooled keep-alive connections
+_session = requests.Session()
+_session.headers.update(HEADERS)
+_session.auth = AUTH
+
+
+# Statuses where Druid refused the task outright, so resending cannot ingest the
+# rows twice. 502/504 are not retried: like a read timeout, the overlord may
+# already have accepted the task behind the gateway.
+RETRY_STATUSES = frozenset({429, 503})
+RETRY_BACKOFF = 0.5
+RETRY_MAX_DELAY = 60.0
+
+
+def _retry_delay(response: Optional[requests.Response], attempt: int) -> float:
+    """Seconds to wait before the next attempt, honoring Retry-After if sent"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = RETRY_BACKOFF * 2**attempt
+    return min(max(delay, 0.0), RETRY_MAX_DELAY)
+
+
+def _never_connected(error: requests.ConnectionError) -> bool:
+    """Whether the request failed before a connection to Druid was made"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the root failure
+    cause = error.args[0] if error.args else None
+    return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+
+
+def _post_ingestion(body: bytes) -> requests.Response:
+    """POST an ingestion spec, retrying throttled and unreachable attempts.
+
+    Read timeouts and connections dropped after connecting are not retried since
+    the task may already have been accepted.
+    """
+    for attempt in range(DRUID_MAX_RETRIES + 1):
+        response = None
+        try:
+            response = _session.post(DRUID_INGEST_URL, data=body, timeout=DRUID_TIMEOUT)
+        except requests.ConnectionError as e:
+            if not _never_connected(e) or attempt == DRUID_MAX_RETRIES:
+                raise
+        else:
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt == DRUID_MAX_RETRIES
+            ):
+                return response
+
+        delay = _retry_delay(response, attempt)
+        logger.warning(
+            "Druid ingestion attempt %d failed, retrying in %.1fs", attempt + 1, delay
+        )
+        time.sleep(delay)
 
 
 def create_ingestion_spec(data_source: str) -> dict:
@@ -48,29 +118,35 @@ def create_ingestion_spec(data_source: str) -> dict:
 def send_to_druid(profiles: list[Employee], companies: list[Company]):
     """Serialize Pydantic models and ingest into Druid"""
 
-    # Convert Pydantic models to JSON strings
-    profile_data = "\n".join([p.model_dump_json() for p in profiles])
-    company_data = "\n".join([c.model_dump_json() for c in companies])
-
     # Create separate ingestion tasks
-    for data, source_name in [
-        (profile_data, "linkedin_profiles"),
-        (company_data, "linkedin_companies"),
-    ]:
-        spec = create_ingestion_spec(source_name)
-        spec["spec"]["ioConfig"]["inputSource"]["data"] = data
+    for models, source_name in (
+        (profiles, "linkedin_profiles"),
+        (companies, "linkedin_companies"),
+    ):
+        if not models:
+            continue
 
-        response = requests.post(
-            DRUID_INGEST_URL,
-            json=spec,
-            headers=HEADERS,
-            auth=AUTH,  # Replace with your credentials (auth,auth for development)
+        # Serialize each source only when its task is sent, one row per model
+        spec = create_ingestion_spec(source_name)
+        spec["spec"]["ioConfig"]["inputSource"]["data"] = "\n".join(
+            m.model_dump_json() for m in models
         )
 
+        try:
+            response = _post_ingestion(orjson.dumps(spec))
+        except requests.Timeout:
+            logger.warning(
+                "Timed out ingesting %s after %ss", source_name, DRUID_TIMEOUT
+            )
+            continue
+        except requests.ConnectionError as e:
+            logger.error("Could not reach Druid to ingest %s: %s", source_name, e)
+            continue
+
         if response.status_code == 200:
-            print(f"Successfully initiated ingestion for {source_name}")
+            logger.debug("Successfully initiated ingestion for %s", source_name)
         else:
-            print(f"Failed to ingest {source_name}: {response.text}")
+            logger.error("Failed to ingest %s: %s", source_name, response.text)
 
 
 # # Usage
@@ -81,7 +157,11 @@ def send_to_druid(profiles: list[Employee], companies: list[Company]):
 
 def query_druid(query: dict) -> dict:
     """Query Druid"""
-    response = requests.post(DRUID_INGEST_URL, json=query, headers=HEADERS, auth=AUTH)
+    response = _session.post(
+        DRUID_INGEST_URL,
+        data=orjson.dumps(query),
+        timeout=DRUID_TIMEOUT,
+    )
     return response.json()
 
 
@@ -121,24 +201,59 @@ def get_start_date(time_period: TimePeriod):
     )  # Create from start data
 
 
+@lru_cache(maxsize=1)
+def _load_transition_spec() -> dict:
+    """Reads the transition ingestion spec once per process"""
+    with open("data_schema/druid_transmission_schema.json", "rb") as f:
+        return orjson.loads(f.read())
+
+
 def send_transition_update(transition_event: dict) -> bool:
     """
     Sends an employee transition event to Druid for ingestion.
     """
-    with open("data_schema/druid_transmission_schema.json") as f:
-        ingestion_spec = json.load(f)
+    return send_transition_updates([transition_event])
 
-    ingestion_spec["spec"]["ioConfig"]["inputSource"]["data"] = json.dumps(
-        transition_event
-    )
 
-    response = requests.post(
-        DRUID_INGEST_URL, json=ingestion_spec, headers=HEADERS, auth=AUTH
+def send_transition_updates(
+    transition_events: list[Union[dict, TransitionEvent]],
+) -> bool:
+    """
+    Sends a batch of transition events to Druid as a single ingestion task.
+    """
+    if not transition_events:
+        return True
+
+    # Copy so filling in the inline data never mutates the cached template
+    ingestion_spec = copy.deepcopy(_load_transition_spec())
+
+    # Each call is one task of many (per request, per job batch); Druid's default
+    # would replace the day segments earlier tasks wrote instead of adding to them
+    ingestion_spec["spec"]["ioConfig"]["appendToExisting"] = True
+
+    # Inline input with the json format is newline-delimited, one event per row;
+    # models serialize straight to JSON without an intermediate dict
+    ingestion_spec["spec"]["ioConfig"]["inputSource"]["data"] = "\n".join(
+        event.model_dump_json()
+        if isinstance(event, TransitionEvent)
+        else orjson.dumps(event).decode()
+        for event in transition_events
     )
 
+    try:
+        response = _post_ingestion(orjson.dumps(ingestion_spec))
+    except requests.Timeout:
+        logger.warning("Timed out sending transitions after %ss", DRUID_TIMEOUT)
+        return False
+    except requests.ConnectionError as e:
+        logger.error("Could not reach Druid to send transitions: %s", e)
+        return False
+
     if response.status_code == 200:
-        print(f"Successfully sent transition event: {transition_event['profile_urn']}")
+        logger.debug("Successfully sent %d transition event(s)", len(transition_events))
         return True
     else:
-        print(f"Error sending transition: {response.status_code} - {response.text}")
+        logger.error(
+            "Error sending transitions: %s - %s", response.status_code, response.text
+        )
         return False
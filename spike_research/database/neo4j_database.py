@@ -1,11 +1,8 @@
 import logging
-import os
+from collections.abc import Sequence
 from typing import Any, Optional
 
 import pandas as pd
-
-# Environment configuration
-from dotenv import load_dotenv
 from neo4j import GraphDatabase as Neo4jDriver
 from neo4j.exceptions import AuthError, ServiceUnavailable
 
@@ -16,15 +13,59 @@ from ..core.models import (
     Investment,
     TransitionEvent,
 )
+from ..utils.config import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
 
 
-load_dotenv(override=True)
+logger = logging.getLogger(__name__)
 
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "neo4j")
+# Scalar Employee fields stored on the node; nested experience/education/skills
+# cannot be node properties, so they are never serialized for writes
+EMPLOYEE_NODE_FIELDS = frozenset(
+    {
+        "profile_urn",
+        "profile_id",
+        "first_name",
+        "last_name",
+        "headline",
+        "summary",
+        "industry_name",
+        "location_name",
+        "career_progression_score",
+        "network_influence",
+    }
+)
 
-logger = logging.getLogger(__name__)
+COMPANY_NODE_FIELDS = frozenset(
+    {
+        "urn",
+        "name",
+        "industries",
+        "funding_stage",
+        "valuation",
+        "exit_status",
+        "founded_year",
+    }
+)
+FUND_NODE_FIELDS = frozenset(
+    {
+        "id",
+        "name",
+        "aum",
+        "vintage",
+        "focus_areas",
+        "stage_focus",
+        "status",
+    }
+)
+
+SCHEMA_STATEMENTS = (
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (e:Employee) REQUIRE e.profile_urn IS UNIQUE",
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (c:Company) REQUIRE c.urn IS UNIQUE",
+    "CREATE CONSTRAINT IF NOT EXISTS FOR (f:Fund) REQUIRE f.id IS UNIQUE",
+    "CREATE INDEX IF NOT EXISTS FOR (e:Employee) ON (e.first_name, e.last_name)",
+    "CREATE INDEX IF NOT EXISTS FOR (c:Company) ON (c.name)",
+    "CREATE INDEX IF NOT EXISTS FOR (t:Transition) ON (t.transition_date)",
+)
 
 
 class VCGraphDatabase:
@@ -52,6 +93,9 @@ class VCGraphDatabase:
             return True
         except (ServiceUnavailable, AuthError) as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
+            # The driver object exists even though it never connected
+            if self.driver is not None:
+                self.driver.close()
             self.driver = None
             return False
 
@@ -79,18 +123,26 @@ class VCGraphDatabase:
                 logger.error(f"Params: {params}")
                 return []
 
+    def execute_query_df(
+        self, query: str, params: dict[str, Any] = None
+    ) -> pd.DataFrame:
+        """Execute Cypher query and load the results straight into a DataFrame"""
+        if not self.driver:
+            logger.error("No active database connection")
+            return pd.DataFrame()
+
+        with self.driver.session() as session:
+            try:
+                return session.run(query, params or {}).to_df()
+            except Exception as e:
+                logger.error(f"Query execution failed: {e}")
+                logger.error(f"Query: {query}")
+                logger.error(f"Params: {params}")
+                return pd.DataFrame()
+
     def setup_constraints(self):
         """Create database constraints and indexes"""
-        constraints = [
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (e:Employee) REQUIRE e.profile_urn IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (c:Company) REQUIRE c.urn IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (f:Fund) REQUIRE f.id IS UNIQUE",
-            "CREATE INDEX IF NOT EXISTS FOR (e:Employee) ON (e.first_name, e.last_name)",
-            "CREATE INDEX IF NOT EXISTS FOR (c:Company) ON (c.name)",
-            "CREATE INDEX IF NOT EXISTS FOR (t:Transition) ON (t.transition_date)",
-        ]
-
-        for constraint in constraints:
+        for constraint in SCHEMA_STATEMENTS:
             self.execute_query(constraint)
         logger.info("Database constraints and indexes created")
 
@@ -108,7 +160,7 @@ class VCGraphDatabase:
             e.location_name = $location_name,
             e.updated_at = datetime()
         """
-        self.execute_query(query, employee.model_dump())
+        self.execute_query(query, employee.model_dump(include=EMPLOYEE_NODE_FIELDS))
 
     def store_company(self, company: Company):
         """Store company entity"""
@@ -206,27 +258,47 @@ class VCGraphDatabase:
         logger.info(f"Created talent flow projection: {graph_name}")
 
     def run_pagerank(
-        self, graph_name: str = "talent_flow", write_property: Optional[str] = None
+        self,
+        graph_name: str = "talent_flow",
+        write_property: Optional[str] = None,
+        damping_factor: float = 0.85,
+        max_iterations: int = 20,
     ) -> pd.DataFrame:
         """Run PageRank algorithm on talent flow graph"""
-        mode = "write" if write_property else "stream"
-        config = {"dampingFactor": 0.85, "maxIterations": 20}
+        # Query text stays constant and every knob is a parameter, so Neo4j
+        # reuses the cached plan across calls
+        params = {
+            "graph": graph_name,
+            "damping": damping_factor,
+            "iterations": max_iterations,
+        }
 
         if write_property:
-            config["writeProperty"] = write_property
-
-        query = f"CALL gds.pageRank.{mode}($graph, $config)"
-        if mode == "stream":
-            query += " YIELD nodeId, score"
-
-        results = self.execute_query(query, {"graph": graph_name, "config": config})
-
-        if mode == "stream":
-            node_ids = [r["nodeId"] for r in results]
-            scores = [r["score"] for r in results]
-            return self._attach_node_names(node_ids, scores, "pagerank_score")
+            query = """
+            CALL gds.pageRank.write($graph, {
+                dampingFactor: $damping,
+                maxIterations: $iterations,
+                writeProperty: $write_property
+            })
+            """
+            self.execute_query(query, {**params, "write_property": write_property})
+            return pd.DataFrame()
 
-        return pd.DataFrame()
+        query = """
+        CALL gds.pageRank.stream($graph, {
+            dampingFactor: $damping,
+            maxIterations: $iterations
+        })
+        YIELD nodeId, score
+        RETURN nodeId, score
+        ORDER BY score DESC
+        """
+        results = self.execute_query_df(query, params).reindex(
+            columns=["nodeId", "score"]
+        )
+        return self._attach_node_names(
+            results["nodeId"].tolist(), results["score"].to_numpy(), "pagerank_score"
+        )
 
     def get_talent_flow_metrics(self, company_urn: str) -> dict[str, Any]:
         """Get talent flow statistics for a company"""
@@ -272,101 +344,198 @@ class VCGraphDatabase:
 
     # ─── Batch Operations ──────────────────────────────────────────────
 
-    def batch_store_employees(self, employees: list[Employee], batch_size: int = 100):
-        """Store employees in batches"""
+    def batch_store_employees(
+        self, employees: list[Employee], batch_size: int = 100
+    ) -> int:
+        """Store employees in batches, returning how many were stored"""
+        # Unchanged rows still count as stored, they just issue no write
+        query = """
+        UNWIND $employees as emp
+        MERGE (e:Employee {profile_urn: emp.profile_urn})
+        WITH e, emp, any(k IN keys(emp) WHERE
+            NOT coalesce(e[k] = emp[k], e[k] IS NULL AND emp[k] IS NULL)) as changed
+        FOREACH (_ IN CASE WHEN changed THEN [1] ELSE [] END |
+            SET e += emp, e.updated_at = datetime())
+        RETURN count(e) as stored
+        """
+        stored = 0
         for i in range(0, len(employees), batch_size):
             batch = employees[i : i + batch_size]
-            employee_data = [emp.model_dump() for emp in batch]
-
-            query = """
-            UNWIND $employees as emp
-            MERGE (e:Employee {profile_urn: emp.profile_urn})
-            SET e += emp, e.updated_at = datetime()
-            """
-            self.execute_query(query, {"employees": employee_data})
-            logger.info(f"Stored {len(batch)} employees")
-
-    def batch_store_transitions(
-        self, transitions: list[TransitionEvent], batch_size: int = 100
-    ):
-        """Store transitions in batches"""
-        for i in range(0, len(transitions), batch_size):
-            batch = transitions[i : i + batch_size]
-            transition_data = [t.model_dump() for t in batch]
+            employee_data = [
+                emp.model_dump(include=EMPLOYEE_NODE_FIELDS) for emp in batch
+            ]
+
+            # execute_query returns [] on failure, so a failed batch counts as 0
+            results = self.execute_query(query, {"employees": employee_data})
+            batch_stored = results[0]["stored"] if results else 0
+            stored += batch_stored
+            logger.info(f"Stored {batch_stored} of {len(batch)} employees")
+        return stored
+
+    def batch_store_companies(
+        self, companies: list[Company], batch_size: int = 100
+    ) -> int:
+        """Store companies in batches, returning how many were stored"""
+        # urn is optional on Company but is the MERGE key; a null urn would fail
+        # the whole batch, so those rows are skipped. Unchanged rows still count
+        # as stored, they just issue no write.
+        query = """
+        UNWIND $companies as comp
+        WITH comp WHERE comp.urn IS NOT NULL
+        MERGE (c:Company {urn: comp.urn})
+        WITH c, comp, any(k IN keys(comp) WHERE
+            NOT coalesce(c[k] = comp[k], c[k] IS NULL AND comp[k] IS NULL)) as changed
+        FOREACH (_ IN CASE WHEN changed THEN [1] ELSE [] END |
+            SET c += comp, c.updated_at = datetime())
+        RETURN count(c) as stored
+        """
+        stored = 0
+        for i in range(0, len(companies), batch_size):
+            batch = companies[i : i + batch_size]
+            company_data = [
+                company.model_dump(include=COMPANY_NODE_FIELDS) for company in batch
+            ]
+
+            # execute_query returns [] on failure, so a failed batch counts as 0
+            results = self.execute_query(query, {"companies": company_data})
+            batch_stored = results[0]["stored"] if results else 0
+            stored += batch_stored
+            logger.info(f"Stored {batch_stored} of {len(batch)} companies")
+        return stored
+
+    def batch_store_funds(self, funds: list[Fund], batch_size: int = 100) -> int:
+        """Store funds in batches, returning how many were stored"""
+        # Unchanged rows still count as stored, they just issue no write
+        query = """
+        UNWIND $funds as fund
+        MERGE (f:Fund {id: fund.id})
+        WITH f, fund, any(k IN keys(fund) WHERE
+            NOT coalesce(f[k] = fund[k], f[k] IS NULL AND fund[k] IS NULL)) as changed
+        FOREACH (_ IN CASE WHEN changed THEN [1] ELSE [] END |
+            SET f += fund, f.updated_at = datetime())
+        RETURN count(f) as stored
+        """
+        stored = 0
+        for i in range(0, len(funds), batch_size):
+            batch = funds[i : i + batch_size]
+            fund_data = [fund.model_dump(include=FUND_NODE_FIELDS) for fund in batch]
+
+            # execute_query returns [] on failure, so a failed batch counts as 0
+            results = self.execute_query(query, {"funds": fund_data})
+            batch_stored = results[0]["stored"] if results else 0
+            stored += batch_stored
+            logger.info(f"Stored {batch_stored} of {len(batch)} funds")
+        return stored
+
+    def batch_store_investments(
+        self, investments: list[Investment], batch_size: int = 100
+    ) -> int:
+        """Store investment relationships in batches, returning how many were
+        stored; rows whose fund or company does not exist are not stored"""
+        query = """
+        UNWIND $investments as data
+        MATCH (fund:Fund {id: data.fund_id})
+        MATCH (company:Company {urn: data.company_id})
 
-            # First ensure companies exist
-            self._ensure_companies_exist(transition_data)
+        CREATE (inv:Investment {
+            id: data.id,
+            amount: data.amount,
+            round_type: data.round_type,
+            date: datetime(data.date),
+            valuation_pre: data.valuation_pre,
+            valuation_post: data.valuation_post,
+            ownership_percentage: data.ownership_percentage
+        })
 
-            # Then create transitions
-            query = """
-            UNWIND $transitions as trans
-            MATCH (from_company:Company {urn: trans.from_company_urn})
-            MATCH (to_company:Company {urn: trans.to_company_urn})
-            MATCH (employee:Employee {profile_urn: trans.profile_urn})
+        CREATE (fund)-[:MADE_INVESTMENT]->(inv)-[:INVESTED_IN]->(company)
+        RETURN count(inv) as stored
+        """
+        stored = 0
+        for i in range(0, len(investments), batch_size):
+            batch = investments[i : i + batch_size]
+            investment_data = [investment.model_dump() for investment in batch]
+
+            # execute_query returns [] on failure, so a failed batch counts as 0
+            results = self.execute_query(query, {"investments": investment_data})
+            batch_stored = results[0]["stored"] if results else 0
+            stored += batch_stored
+            logger.info(f"Stored {batch_stored} of {len(batch)} investments")
+        return stored
 
-            CREATE (t:Transition)
-            SET t += trans, t.transition_date = datetime(trans.transition_date)
+    def batch_store_transitions(
+        self, transitions: list[TransitionEvent], batch_size: int = 1000
+    ) -> int:
+        """Store transitions in batches, returning how many were stored"""
+        # Each row MERGEs its own endpoint companies, so a transition is never
+        # dropped because a referenced company is missing
+        query = """
+        UNWIND $transitions as trans
+        MERGE (from_company:Company {urn: trans.from_company_urn})
+        ON CREATE SET from_company.name = trans.from_company_urn,
+                      from_company.created_at = datetime()
+        MERGE (to_company:Company {urn: trans.to_company_urn})
+        ON CREATE SET to_company.name = trans.to_company_urn,
+                      to_company.created_at = datetime()
+        WITH trans, from_company, to_company
+        MATCH (employee:Employee {profile_urn: trans.profile_urn})
+
+        CREATE (t:Transition)
+        SET t += trans, t.transition_date = datetime(trans.transition_date)
 
-            CREATE (employee)-[:HAS_TRANSITION]->(t)
-            CREATE (t)-[:FROM_COMPANY]->(from_company)
-            CREATE (t)-[:TO_COMPANY]->(to_company)
-            """
-            self.execute_query(query, {"transitions": transition_data})
-            logger.info(f"Stored {len(batch)} transitions")
+        CREATE (employee)-[:HAS_TRANSITION]->(t)
+        CREATE (t)-[:FROM_COMPANY]->(from_company)
+        CREATE (t)-[:TO_COMPANY]->(to_company)
+        RETURN count(t) as stored
+        """
+        # Serialize one batch at a time so only a batch of dicts is held at once
+        stored = 0
+        for i in range(0, len(transitions), batch_size):
+            batch = [t.model_dump() for t in transitions[i : i + batch_size]]
+            # execute_query returns [] on failure, so a failed batch counts as 0
+            results = self.execute_query(query, {"transitions": batch})
+            batch_stored = results[0]["stored"] if results else 0
+            stored += batch_stored
+            logger.info(f"Stored {batch_stored} of {len(batch)} transitions")
+        return stored
 
     # ─── Utility Methods ──────────────────────────────────────────────
 
     def _attach_node_names(
-        self, node_ids: list[int], scores: list[float], score_col: str
+        self, node_ids: list[int], scores: Sequence[float], score_col: str
     ) -> pd.DataFrame:
-        """Attach human-readable names to node IDs"""
-        name_map = {}
+        """Attach human-readable names to node IDs, preserving their order"""
+        df = pd.DataFrame({"node_id": node_ids, score_col: scores})
+
+        names = pd.DataFrame(columns=["name", "type"])
         if node_ids:
+            # One row of parallel arrays rather than one record per node;
+            # collect() drops nulls, so coalesce to keep the arrays aligned
             query = """
             MATCH (n) WHERE id(n) IN $ids
-            RETURN id(n) as id,
-                   CASE
-                     WHEN labels(n)[0] = 'Employee' THEN n.first_name + ' ' + n.last_name
-                     WHEN labels(n)[0] = 'Company' THEN n.name
-                     ELSE toString(id(n))
-                   END as name,
-                   labels(n)[0] as type
+            WITH n, labels(n)[0] as label
+            RETURN collect(id(n)) as ids,
+                   collect(coalesce(
+                     CASE
+                       WHEN label = 'Employee' THEN n.first_name + ' ' + n.last_name
+                       WHEN label = 'Company' THEN n.name
+                       ELSE toString(id(n))
+                     END,
+                     'Node_' + toString(id(n))
+                   )) as names,
+                   collect(coalesce(label, 'Unknown')) as types
             """
             results = self.execute_query(query, {"ids": node_ids})
-            name_map = {
-                r["id"]: {"name": r["name"], "type": r["type"]} for r in results
-            }
-
-        df = pd.DataFrame(
-            {
-                "node_id": node_ids,
-                score_col: scores,
-                "name": [
-                    name_map.get(nid, {}).get("name", f"Node_{nid}") for nid in node_ids
-                ],
-                "type": [
-                    name_map.get(nid, {}).get("type", "Unknown") for nid in node_ids
-                ],
-            }
+            if results:
+                row = results[0]
+                names = pd.DataFrame(
+                    {"name": row["names"], "type": row["types"]}, index=row["ids"]
+                )
+
+        df["name"] = (
+            df["node_id"].map(names["name"]).fillna("Node_" + df["node_id"].astype(str))
         )
-        return df.sort_values(score_col, ascending=False)
-
-    def _ensure_companies_exist(self, transition_data: list[dict]):
-        """Ensure all companies referenced in transitions exist"""
-        company_urns = set()
-        for t in transition_data:
-            if t.get("from_company_urn"):
-                company_urns.add(t["from_company_urn"])
-            if t.get("to_company_urn"):
-                company_urns.add(t["to_company_urn"])
-
-        if company_urns:
-            query = """
-            UNWIND $urns as urn
-            MERGE (c:Company {urn: urn})
-            ON CREATE SET c.name = urn, c.created_at = datetime()
-            """
-            self.execute_query(query, {"urns": list(company_urns)})
+        df["type"] = df["node_id"].map(names["type"]).fillna("Unknown")
+        return df
 
     def clear_database(self):
         """Clear all data (use with caution!)"""
@@ -4,11 +4,16 @@ from .config import (
     API_HOST,
     API_PORT,
     DRUID_INGEST_URL,
+    DRUID_MAX_RETRIES,
     DRUID_PASSWORD,
+    DRUID_TIMEOUT,
     DRUID_USER,
+    MAX_REQUEST_BYTES,
+    NEO4J_MAX_CONCURRENCY,
     NEO4J_PASSWORD,
     NEO4J_URI,
     NEO4J_USER,
+    PAGERANK_CACHE_TTL,
     PROXY_ENABLED,
     PROXY_URL,
 )
@@ -18,11 +23,16 @@ __all__ = [
     "API_HOST",
     "API_PORT",
     "DRUID_INGEST_URL",
+    "DRUID_MAX_RETRIES",
     "DRUID_PASSWORD",
+    "DRUID_TIMEOUT",
     "DRUID_USER",
+    "MAX_REQUEST_BYTES",
+    "NEO4J_MAX_CONCURRENCY",
     "NEO4J_PASSWORD",
     "NEO4J_URI",
     "NEO4J_USER",
+    "PAGERANK_CACHE_TTL",
     "PROXY_ENABLED",
     "PROXY_URL",
 ]
@@ -10,6 +10,9 @@ load_dotenv(override=True)
 # API settings
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "5001"))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(50 * 1024 * 1024)))
+# Seconds a streamed PageRank result is reused before it is recomputed
+PAGERANK_CACHE_TTL = float(os.getenv("PAGERANK_CACHE_TTL", "300"))
 
 # LinkedIn API settings
 LINKEDIN_USER = os.getenv("LINKEDIN_USER_1")
@@ -19,11 +22,16 @@ LINKEDIN_PASS = os.getenv("LINKEDIN_PASS_1")
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "neo4j")
+NEO4J_MAX_CONCURRENCY = int(os.getenv("NEO4J_MAX_CONCURRENCY", "16"))
 
 # Druid settings
 DRUID_INGEST_URL = os.getenv("DRUID_INGEST_URL")
 DRUID_USER = os.getenv("DRUID_USER")
 DRUID_PASSWORD = os.getenv("DRUID_PASSWORD")
+# Seconds to wait on Druid before giving up on a request
+DRUID_TIMEOUT = float(os.getenv("DRUID_TIMEOUT", "10"))
+# Extra attempts for throttled (429/503) or unreachable ingestion requests
+DRUID_MAX_RETRIES = int(os.getenv("DRUID_MAX_RETRIES", "3"))
 
 # Proxy settings
 PROXY_ENABLED = os.getenv("PROXY_ENABLED", "false").lower() == "true"
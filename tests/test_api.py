@@ -0,0 +1,357 @@
+import time
+from unittest import mock
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from neo4j.exceptions import ServiceUnavailable
+
+from spike_research.api import api
+from spike_research.database import druid_database
+
+
+def make_transitions(count: int) -> list[dict]:
+    return [
+        {
+            "profile_urn": f"urn:li:person:{i}",
+            "from_company_urn": "urn:li:company:1",
+            "to_company_urn": "urn:li:company:2",
+            "transition_date": "2024-01-01T00:00:00",
+            "transition_type": "company_change",
+            "old_title": "Engineer",
+            "new_title": "Senior Engineer",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def db():
+    db = mock.MagicMock()
+    db.batch_store_transitions.side_effect = lambda batch: len(batch)
+    with mock.patch.object(api, "get_database", return_value=db):
+        yield db
+
+
+@pytest.fixture
+def druid_post():
+    response = mock.MagicMock(status_code=200)
+    with mock.patch.object(druid_database._session, "post", return_value=response):
+        yield druid_database._session.post
+
+
+@pytest.fixture
+def client():
+    api.JOBS.clear()
+    yield TestClient(api.app)
+    api.JOBS.clear()
+
+
+def test_store_transitions_reports_stored_count(client, db, druid_post):
+    db.batch_store_transitions.side_effect = lambda batch: len(batch) - 1
+
+    response = client.post("/api/data/transitions", json=make_transitions(3))
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": False,
+        "stored": 2,
+        "failed": 1,
+        "druid_failed": 0,
+    }
+    druid_post.assert_called_once()
+
+
+def test_store_transitions_reports_druid_failure(client, db, druid_post):
+    druid_post.return_value.status_code = 400
+
+    response = client.post("/api/data/transitions", json=make_transitions(2))
+
+    assert response.json() == {
+        "success": True,
+        "stored": 2,
+        "failed": 0,
+        "druid_failed": 2,
+    }
+
+
+def test_store_employees_reports_stored_count(client, db):
+    db.batch_store_employees.return_value = 1
+
+    employees = [
+        {
+            "profile_id": str(i),
+            "profile_urn": f"urn:li:person:{i}",
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+        }
+        for i in range(2)
+    ]
+
+    response = client.post("/api/data/employees", json=employees)
+
+    assert response.status_code == 200
+    assert response.json() == {"success": False, "stored": 1, "failed": 1}
+
+
+def test_background_job_completes(client, db, druid_post):
+    response = client.post(
+        "/api/data/transitions",
+        params={"background": True},
+        json=make_transitions(api.JOB_BATCH_SIZE + 1),
+    )
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["events"] == f"/api/jobs/{job_id}/events"
+
+    job = client.get(f"/api/jobs/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["total"] == job["done"] == job["stored"] == api.JOB_BATCH_SIZE + 1
+    assert job["failed"] == job["druid_failed"] == 0
+    assert db.batch_store_transitions.call_count == 2
+    assert druid_post.call_count == 2
+    # Later batches must add to, not replace, segments written by earlier ones
+    for call in druid_post.call_args_list:
+        spec = orjson.loads(call.kwargs["data"])
+        assert spec["spec"]["ioConfig"]["appendToExisting"] is True
+
+
+def test_background_job_counts_store_failures(client, db, druid_post):
+    db.batch_store_transitions.side_effect = lambda batch: 0
+
+    job_id = client.post(
+        "/api/data/transitions", params={"background": True}, json=make_transitions(2)
+    ).json()["job_id"]
+
+    job = client.get(f"/api/jobs/{job_id}").json()
+    assert job["status"] == "failed"
+    assert job["failed"] == 2
+    assert job["error"] == "No transitions were stored"
+
+
+def test_background_job_counts_druid_failures(client, db, druid_post):
+    druid_post.return_value.status_code = 400
+
+    job_id = client.post(
+        "/api/data/transitions", params={"background": True}, json=make_transitions(2)
+    ).json()["job_id"]
+
+    job = client.get(f"/api/jobs/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["stored"] == 2
+    assert job["druid_failed"] == 2
+
+
+def test_job_events_stream_until_finished(client, db, druid_post):
+    job_id = client.post(
+        "/api/data/transitions", params={"background": True}, json=make_transitions(2)
+    ).json()["job_id"]
+
+    response = client.get(f"/api/jobs/{job_id}/events")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        orjson.loads(line.removeprefix("data: "))
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert events[-1]["status"] == "completed"
+    assert events[-1]["stored"] == 2
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.get("/api/jobs/missing/events").status_code == 404
+
+
+def test_finished_jobs_are_pruned(client):
+    now = time.time()
+    api.JOBS["expired"] = {"status": "completed", "finished_at": now - api.JOB_TTL}
+    api.JOBS["recent"] = {"status": "failed", "finished_at": now}
+    api.JOBS["running"] = {"status": "running"}
+
+    api._prune_jobs()
+
+    assert list(api.JOBS) == ["recent", "running"]
+
+
+def test_job_registry_is_capped(client):
+    now = time.time()
+    with mock.patch.object(api, "JOB_MAX", 2):
+        api.JOBS["running"] = {"status": "running"}
+        for job_id in ("old", "new"):
+            api.JOBS[job_id] = {"status": "completed", "finished_at": now}
+
+        api._prune_jobs()
+
+    assert list(api.JOBS) == ["running"]
+
+
+def test_store_companies_reports_stored_count(client, db):
+    db.batch_store_companies.return_value = 1
+
+    response = client.post(
+        "/api/data/companies",
+        json=[{"name": "Acme", "urn": "urn:li:company:1"}, {"name": "No URN"}],
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"success": False, "stored": 1, "failed": 1}
+
+
+def test_db_calls_are_bounded_by_run_db(client, db, druid_post):
+    db.batch_store_companies.return_value = 1
+    bounded = []
+    run_db = api._run_db
+
+    async def spy(func, *args, **kwargs):
+        bounded.append(func)
+        return await run_db(func, *args, **kwargs)
+
+    with mock.patch.object(api, "_run_db", spy):
+        client.post("/api/data/companies", json=[{"name": "Acme", "urn": "u"}])
+        client.post(
+            "/api/data/transitions",
+            params={"background": True},
+            json=make_transitions(1),
+        )
+        client.post("/api/query", json={"cypher": "RETURN 1"})
+
+    assert bounded == [
+        db.batch_store_companies,
+        db.batch_store_transitions,
+        db.execute_query,
+    ]
+
+
+@pytest.fixture
+def limited_client():
+    limited = FastAPI()
+    limited.add_middleware(api.RequestSizeLimitMiddleware, max_bytes=10)
+
+    @limited.post("/echo")
+    async def echo(items: list[int]):
+        return items
+
+    return TestClient(limited)
+
+
+def test_declared_oversized_body_is_rejected(limited_client):
+    response = limited_client.post("/echo", content=b"[1, 2, 3, 4, 5]")
+
+    assert response.status_code == 413
+
+
+def test_chunked_oversized_body_is_rejected(limited_client):
+    # A generator body is sent with Transfer-Encoding: chunked, no Content-Length
+    chunks = iter([b"[1, 2, 3,", b" 4, 5, 6]"])
+    response = limited_client.post(
+        "/echo", content=chunks, headers={"Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds 10 bytes"}
+
+
+def test_small_chunked_body_is_accepted(limited_client):
+    response = limited_client.post(
+        "/echo",
+        content=iter([b"[1,", b" 2]"]),
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [1, 2]
+
+
+def test_size_limit_responses_carry_cors_headers(client):
+    oversized = b" " * (api.MAX_REQUEST_BYTES + 1)
+    response = client.post(
+        "/api/query", content=oversized, headers={"Origin": "http://example.com"}
+    )
+
+    assert response.status_code == 413
+    assert "access-control-allow-origin" in response.headers
+
+
+def test_store_funds_reports_stored_count(client, db):
+    db.batch_store_funds.return_value = 0
+
+    response = client.post(
+        "/api/data/funds", json=[{"id": "f1", "name": "Fund I", "vintage": 2020}]
+    )
+
+    assert response.json() == {"success": False, "stored": 0, "failed": 1}
+
+
+def test_store_investments_reports_stored_count(client, db):
+    db.batch_store_investments.side_effect = lambda investments: len(investments)
+    investment = {
+        "id": "i1",
+        "fund_id": "f1",
+        "company_id": "urn:li:company:1",
+        "round_type": "seed",
+        "date": "2024-01-01T00:00:00",
+    }
+
+    response = client.post("/api/data/investments", json=[investment])
+
+    assert response.json() == {"success": True, "stored": 1, "failed": 0}
+
+
+@pytest.fixture
+def no_database():
+    with mock.patch.object(api, "_database", None):
+        with mock.patch.object(api, "_database_failed_at", None):
+            yield
+
+
+def test_get_database_fails_fast_after_a_failed_connect(no_database):
+    down = mock.MagicMock(driver=None)
+    with mock.patch.object(
+        api, "create_database_connection", return_value=down
+    ) as create:
+        for _ in range(3):
+            with pytest.raises(ServiceUnavailable):
+                api.get_database()
+
+    create.assert_called_once()
+
+
+def test_get_database_reconnects_after_backoff(no_database):
+    down, up = mock.MagicMock(driver=None), mock.MagicMock()
+    with mock.patch.object(api, "create_database_connection", side_effect=[down, up]):
+        with pytest.raises(ServiceUnavailable):
+            api.get_database()
+        with mock.patch.object(api, "RECONNECT_BACKOFF", 0):
+            assert api.get_database() is up
+        assert api.get_database() is up
+
+
+@pytest.fixture
+def pagerank_cache():
+    api._pagerank_cache.clear()
+    yield api._pagerank_cache
+    api._pagerank_cache.clear()
+
+
+def test_pagerank_results_are_cached(db, pagerank_cache):
+    db.run_pagerank.return_value.to_dict.return_value = [{"score": 1.0}]
+
+    for _ in range(2):
+        assert api._cached_pagerank("g", 0.85, 20) == [{"score": 1.0}]
+
+    db.run_pagerank.assert_called_once()
+
+
+def test_pagerank_computed_across_invalidation_is_not_cached(db, pagerank_cache):
+    def rebuilt_during_run(**kwargs):
+        api._invalidate_pagerank()
+        return mock.MagicMock(to_dict=mock.MagicMock(return_value=[{"score": 1.0}]))
+
+    db.run_pagerank.side_effect = rebuilt_during_run
+
+    assert api._cached_pagerank("g", 0.85, 20) == [{"score": 1.0}]
+    assert pagerank_cache == {}
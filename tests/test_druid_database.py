@@ -0,0 +1,109 @@
+from unittest import mock
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from spike_research.database import druid_database
+
+
+def make_response(status_code: int, headers: dict = None) -> mock.MagicMock:
+    return mock.MagicMock(status_code=status_code, headers=headers or {}, text="")
+
+
+def refused() -> requests.ConnectionError:
+    """What requests raises when the TCP connection is never established"""
+    reason = NewConnectionError(None, "Connection refused")
+    return requests.ConnectionError(MaxRetryError(None, "/", reason))
+
+
+def dropped() -> requests.ConnectionError:
+    """What requests raises when the server closes after reading the body"""
+    return requests.ConnectionError(
+        ProtocolError("Connection aborted.", ConnectionResetError())
+    )
+
+
+@pytest.fixture
+def post():
+    with mock.patch.object(druid_database._session, "post") as post:
+        yield post
+
+
+@pytest.fixture
+def sleep():
+    with mock.patch.object(druid_database.time, "sleep") as sleep:
+        yield sleep
+
+
+def test_throttled_ingestion_honors_retry_after(post, sleep):
+    post.side_effect = [make_response(429, {"Retry-After": "7"}), make_response(200)]
+
+    assert druid_database._post_ingestion(b"{}").status_code == 200
+    assert post.call_count == 2
+    sleep.assert_called_once_with(7.0)
+
+
+def test_unavailable_ingestion_backs_off_exponentially(post, sleep):
+    post.side_effect = [make_response(503), make_response(503), make_response(200)]
+
+    assert druid_database._post_ingestion(b"{}").status_code == 200
+    backoff = druid_database.RETRY_BACKOFF
+    assert [c.args[0] for c in sleep.call_args_list] == [backoff, backoff * 2]
+
+
+def test_retry_after_is_capped(post, sleep):
+    post.side_effect = [
+        make_response(429, {"Retry-After": "86400"}),
+        make_response(200),
+    ]
+
+    druid_database._post_ingestion(b"{}")
+    sleep.assert_called_once_with(druid_database.RETRY_MAX_DELAY)
+
+
+@pytest.mark.parametrize("status_code", [400, 500, 502, 504])
+def test_ambiguous_or_permanent_failures_are_not_retried(post, sleep, status_code):
+    post.return_value = make_response(status_code)
+
+    assert druid_database._post_ingestion(b"{}").status_code == status_code
+    assert post.call_count == 1
+    sleep.assert_not_called()
+
+
+def test_retries_stop_after_max_attempts(post, sleep):
+    post.return_value = make_response(429)
+
+    assert druid_database._post_ingestion(b"{}").status_code == 429
+    assert post.call_count == druid_database.DRUID_MAX_RETRIES + 1
+
+
+@pytest.mark.parametrize("error", [refused, requests.ConnectTimeout])
+def test_failed_connects_are_retried(post, sleep, error):
+    post.side_effect = [error(), make_response(200)]
+
+    assert druid_database._post_ingestion(b"{}").status_code == 200
+    assert post.call_count == 2
+
+
+def test_connection_dropped_after_send_is_not_retried(post, sleep):
+    post.side_effect = dropped()
+
+    assert druid_database.send_transition_updates([{"profile_urn": "p"}]) is False
+    assert post.call_count == 1
+    sleep.assert_not_called()
+
+
+def test_read_timeout_is_not_retried(post, sleep):
+    post.side_effect = requests.ReadTimeout()
+
+    assert druid_database.send_transition_updates([{"profile_urn": "p"}]) is False
+    assert post.call_count == 1
+    sleep.assert_not_called()
+
+
+def test_unreachable_druid_fails_the_send(post, sleep):
+    post.side_effect = refused()
+
+    assert druid_database.send_transition_updates([{"profile_urn": "p"}]) is False
+    assert post.call_count == druid_database.DRUID_MAX_RETRIES + 1
@@ -0,0 +1,16 @@
+from unittest import mock
+
+from neo4j.exceptions import ServiceUnavailable
+
+from spike_research.database import neo4j_database
+
+
+def test_failed_connect_closes_the_driver():
+    driver = mock.MagicMock()
+    driver.verify_connectivity.side_effect = ServiceUnavailable("down")
+
+    with mock.patch.object(neo4j_database.Neo4jDriver, "driver", return_value=driver):
+        db = neo4j_database.VCGraphDatabase()
+
+    assert db.driver is None
+    driver.close.assert_called_once()